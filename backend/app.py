@@ -115,35 +115,46 @@ async def health():
     }
 
 
+async def _get_plug_status(p):
+    """Get (is_on, timer_remaining, current_power) for a plug, all None on failure."""
+    def get_plug_status():
+        return (
+            p.get_status(),
+            p.get_rule_remain_seconds(),
+            p.get_current_power()
+        )
+
+    try:
+        return await run_plug_operation(p, get_plug_status)
+    except Exception as e:
+        logger.error(f"Failed to get plug status [plug_name={p.name}, address={p.address}, error={type(e).__name__}: {e}]")
+        return None, None, None
+
+
 @app.get('/api/plugs')
 async def plugs():
-    out = []
-    all_schedules = await run_in_threadpool(get_scheduled_events)
-    for p in get_plugs():
-        try:
-            def get_plug_status():
-                return (
-                    p.get_status(),
-                    p.get_rule_remain_seconds(),
-                    p.get_current_power()
-                )
-            st, tr, current_power = await run_plug_operation(p, get_plug_status)
-        except Exception as e:
-            logger.error(f"Failed to get plug status [plug_name={p.name}, address={p.address}, error={type(e).__name__}: {e}]")
-            st = None
-            tr = None
-            current_power = None
-
-        # Get schedules for this plug
-        schedules = [s for s in all_schedules if s['plug_address'] == p.address]
+    plug_list = get_plugs()
+
+    # Query all plugs concurrently, each plug is a separate device
+    all_schedules, *statuses = await asyncio.gather(
+        run_in_threadpool(get_scheduled_events),
+        *(_get_plug_status(p) for p in plug_list)
+    )
 
+    # Group schedules by plug
+    schedules_by_plug = {}
+    for s in all_schedules:
+        schedules_by_plug.setdefault(s['plug_address'], []).append(s)
+
+    out = []
+    for p, (st, tr, current_power) in zip(plug_list, statuses):
         out.append({
             'name': p.name,
             'address': p.address,
             'automatic_schedules': p.automatic_schedules,
             'is_on': st,
             'timer_remaining': tr,
-            'schedules': schedules,
+            'schedules': schedules_by_plug.get(p.address, []),
             'current_power': current_power
         })
     return out
@@ -102,8 +102,10 @@ def render_pending_schedules(schedules: list[dict]) -> str:
     if not schedules:
         return '<div style="font-size: 12px; color: #9ca3af; font-style: italic;">No pending schedules</div>'
 
-    html = '<div style="display: flex; flex-direction: column; gap: 4px; margin-top: 8px;">'
-    html += '<div style="font-size: 12px; font-weight: 600; color: #6b7280;">Pending Schedules:</div>'
+    html = [
+        '<div style="display: flex; flex-direction: column; gap: 4px; margin-top: 8px;">',
+        '<div style="font-size: 12px; font-weight: 600; color: #6b7280;">Pending Schedules:</div>'
+    ]
 
     for schedule in schedules:
         type_badge = render_type_badge(schedule['type'])
@@ -115,7 +117,7 @@ def render_pending_schedules(schedules: list[dict]) -> str:
         duration_html = f'<span style="color: #9ca3af;">({duration})</span>' if duration else ''
         recurrence_html = f'<div style="font-size: 11px; color: #6b7280; margin-left: 20px;">{recurrence_pattern}</div>' if recurrence_pattern else ''
 
-        html += f'''
+        html.append(f'''
         <div style="display: flex; flex-direction: column; gap: 2px;">
             <div style="display: flex; align-items: center; gap: 6px; font-size: 12px; color: #374151; padding: 4px 0;">
                 {type_badge}
@@ -127,10 +129,10 @@ def render_pending_schedules(schedules: list[dict]) -> str:
             </div>
             {recurrence_html}
         </div>
-        '''
+        ''')
 
-    html += '</div>'
-    return html
+    html.append('</div>')
+    return ''.join(html)
 
 
 def render_header() -> str:
@@ -198,13 +200,15 @@ def render_inline_chart(prices: list[tuple[int, float]], target_hours: list[int]
     if not prices:
         return "<p>No price data available</p>"
 
-    min_price = min(p for _, p in prices)
-    max_price = max(p for _, p in prices)
+    # Split out the price column once, min/max then run over a plain list
+    price_values = [p for _, p in prices]
+    min_price = min(price_values)
+    max_price = max(price_values)
     price_range = max_price - min_price if max_price > min_price else 1
 
-    target_hours = target_hours or []
+    target_hours = set(target_hours or [])
 
-    chart_rows = ""
+    chart_rows = []
     for hour, price in prices:
         # Calculate bar width (percentage of max price)
         width_pct = ((price - min_price) / price_range * 100) if price_range > 0 else 50
@@ -216,7 +220,7 @@ def render_inline_chart(prices: list[tuple[int, float]], target_hours: list[int]
         target_badge = f'''<span style="display: inline-flex; align-items: center; padding: 2px 6px; font-size: 10px;
                                        font-weight: 600; color: #1e40af; background-color: #dbeafe; border-radius: 3px;">Target</span>''' if hour in target_hours else ""
 
-        chart_rows += f'''
+        chart_rows.append(f'''
         <div style="display: flex; align-items: center; gap: 8px; padding: 2px 0;">
             <div style="font-family: Arial, sans-serif; font-size: 12px; color: #6b7280; text-align: right;
                         width: 32px; flex-shrink: 0;">{hour}h</div>
@@ -230,7 +234,7 @@ def render_inline_chart(prices: list[tuple[int, float]], target_hours: list[int]
                 {target_badge}
             </div>
         </div>
-        '''
+        ''')
 
     return f'''
     <div style="display: flex; flex-direction: column; gap: 2px; margin: 16px 0;">
@@ -239,7 +243,7 @@ def render_inline_chart(prices: list[tuple[int, float]], target_hours: list[int]
             {icon_chart()}
             <span>Hourly Electricity Prices</span>
         </div>
-        {chart_rows}
+        {''.join(chart_rows)}
     </div>
     '''
 
@@ -298,7 +302,7 @@ def render_daily_summary_email(date: str, prices: list[tuple[int, float]], plugs
     chart_html = render_inline_chart(prices, all_target_hours)
 
     # Render plugs
-    plugs_html = ""
+    plugs_html = []
     for plug_info in plugs_info:
         # Get mode and status
         automatic_mode = plug_info.get('automatic_mode', True)
@@ -311,7 +315,7 @@ def render_daily_summary_email(date: str, prices: list[tuple[int, float]], plugs
         else:
             status_html = '<span style="font-size: 11px; color: #9ca3af; font-style: italic;">Unknown</span>'
 
-        plug_content = f'''
+        plug_content = [f'''
         <div style="display: flex; flex-direction: column; gap: 8px;">
             <div style="display: flex; align-items: center; justify-content: space-between;">
                 <div style="display: flex; align-items: center; gap: 8px; font-size: 15px; font-weight: 600; color: #111827;">
@@ -325,22 +329,22 @@ def render_daily_summary_email(date: str, prices: list[tuple[int, float]], plugs
                 <span>Status:</span>
                 {status_html}
             </div>
-        '''
+        ''']
 
         # Strategy section (only if strategy is configured)
         if plug_info.get('strategy_name'):
-            plug_content += f'''
+            plug_content.append(f'''
             <div style="font-size: 13px; color: #6b7280;">
                 Strategy: {plug_info['strategy_name']}
             </div>
-            '''
+            ''')
 
             if plug_info['strategy_type'] == 'period':
                 for period in plug_info.get('periods', []):
                     if period.get('target_hour') is None:
                         continue
 
-                    plug_content += f'''
+                    plug_content.append(f'''
                     <div style="display: flex; flex-direction: column; gap: 4px; background-color: #f0fdf4;
                                 padding: 8px; border-radius: 4px; border-left: 3px solid #10b981;">
                         <div style="font-size: 12px; color: #065f46;">
@@ -361,13 +365,13 @@ def render_daily_summary_email(date: str, prices: list[tuple[int, float]], plugs
                             <span>Duration: <strong>{period['runtime_human']}</strong></span>
                         </div>
                     </div>
-                    '''
+                    ''')
 
             elif plug_info['strategy_type'] == 'valley':
                 valley_info = plug_info.get('valley_info', {})
                 hours_str = ', '.join(f"{h}h" for h in valley_info.get('target_hours', []))
 
-                plug_content += f'''
+                plug_content.append(f'''
                 <div style="display: flex; flex-direction: column; gap: 4px; background-color: #eff6ff;
                             padding: 8px; border-radius: 4px; border-left: 3px solid #3b82f6;">
                     <div style="display: flex; align-items: center; gap: 6px; font-size: 12px; color: #1e40af;">
@@ -387,13 +391,13 @@ def render_daily_summary_email(date: str, prices: list[tuple[int, float]], plugs
                         <span>Total runtime: <strong>{valley_info.get('runtime_human', 'N/A')}</strong> ({valley_info.get('runtime_seconds', 0)} seconds)</span>
                     </div>
                 </div>
-                '''
+                ''')
 
         # Pending schedules section
-        plug_content += render_pending_schedules(pending_schedules)
+        plug_content.append(render_pending_schedules(pending_schedules))
 
-        plug_content += '</div>'
-        plugs_html += render_card(plug_content)
+        plug_content.append('</div>')
+        plugs_html.append(render_card(''.join(plug_content)))
 
     # Build complete email
     email_html = f'''
@@ -420,7 +424,7 @@ def render_daily_summary_email(date: str, prices: list[tuple[int, float]], plugs
                     <span>Plugs</span>
                 </h3>
 
-                {plugs_html}
+                {''.join(plugs_html)}
             </div>
         </div>
 
@@ -453,6 +457,17 @@ def render_schedule_execution_email(plug_name: str, event_type: str, from_state:
     """
     state_str = "ON" if to_state else "OFF"
 
+    duration_html = ''
+    if duration_info:
+        duration_html = f'''
+        <div style="background-color: #fef3c7; padding: 16px; border-radius: 8px; margin-top: 24px; border-left: 4px solid #f59e0b;">
+            <div style="display: flex; align-items: center; justify-content: center; font-size: 16px; color: #92400e; gap: 8px;">
+                {icon_clock(24, "#d97706")}
+                <span>{duration_info}</span>
+            </div>
+        </div>
+        '''
+
     card_content = f'''
     <div>
         <div style="display: flex; align-items: center; justify-content: center; margin-bottom: 20px; gap: 8px;">
@@ -466,19 +481,7 @@ def render_schedule_execution_email(plug_name: str, event_type: str, from_state:
         </div>
 
         {render_state_transition(from_state, to_state)}
-    '''
-
-    if duration_info:
-        card_content += f'''
-        <div style="background-color: #fef3c7; padding: 16px; border-radius: 8px; margin-top: 24px; border-left: 4px solid #f59e0b;">
-            <div style="display: flex; align-items: center; justify-content: center; font-size: 16px; color: #92400e; gap: 8px;">
-                {icon_clock(24, "#d97706")}
-                <span>{duration_info}</span>
-            </div>
-        </div>
-        '''
-
-    card_content += '</div>'
+    {duration_html}</div>'''
 
     email_html = f'''
     <!DOCTYPE html>
@@ -1,12 +1,27 @@
 from __future__ import annotations
 
+import atexit
 import logging
+import queue
 import smtplib
+import threading
+from email.message import Message
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
 logger = logging.getLogger("uvicorn.error")
 
+# SMTP connection kept open between emails, guarded by _smtp_lock.
+# The sender thread closes it after _SMTP_IDLE_SECONDS without emails.
+_smtp_lock = threading.Lock()
+_smtp: smtplib.SMTP | None = None
+_SMTP_IDLE_SECONDS = 60
+
+# Emails waiting for the background sender thread, started on first use
+_email_queue: queue.Queue[tuple[str, str, str, str]] = queue.Queue()
+_email_worker_lock = threading.Lock()
+_email_worker: threading.Thread | None = None
+
 
 def send_email(subject, content, from_email, to_email, attach_chart=False):
     """Send HTML email via postfix SMTP server.
@@ -28,7 +43,84 @@ def send_email(subject, content, from_email, to_email, attach_chart=False):
     mime_message.attach(mime_text)
 
     try:
-        with smtplib.SMTP('postfix') as smtp_server:
-            smtp_server.sendmail(from_email, to_email, mime_message.as_string())
+        with _smtp_lock:
+            _sendmail(from_email, to_email, mime_message)
     except Exception as err:
         logger.error(f"Failed to send email [error={err}]")
+
+
+def _sendmail(from_email, to_email, message: Message):
+    """Send through the shared SMTP connection, reconnecting once if it was dropped.
+
+    The message is flattened straight to bytes by send_message, without an
+    intermediate as_string() copy.
+
+    Must be called under _smtp_lock.
+    """
+    global _smtp
+    if _smtp is not None:
+        try:
+            _smtp.send_message(message, from_email, to_email)
+            return
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # Idle connections get closed by the server, open a new one below
+            _close_smtp()
+
+    _smtp = smtplib.SMTP('postfix')
+    # The sender thread closes the connection once it goes idle
+    _start_email_worker()
+    try:
+        _smtp.send_message(message, from_email, to_email)
+    except (smtplib.SMTPServerDisconnected, ConnectionError):
+        _close_smtp()
+        raise
+
+
+def _close_smtp():
+    """Close the shared SMTP connection, ignoring errors. Must be called under _smtp_lock."""
+    global _smtp
+    try:
+        _smtp.quit()
+    except Exception:
+        # Connection already dropped, just release the socket
+        _smtp.close()
+    _smtp = None
+
+
+@atexit.register
+def close_smtp_connection():
+    """Close the shared SMTP connection if open (on idle and at interpreter exit)."""
+    with _smtp_lock:
+        if _smtp is not None:
+            _close_smtp()
+
+
+def queue_email(subject, content, from_email, to_email):
+    """Queue an HTML email to be sent by a background thread.
+
+    Use instead of send_email from time-sensitive loops, so SMTP latency
+    doesn't delay them. Arguments are the same as send_email.
+    """
+    _start_email_worker()
+    _email_queue.put((subject, content, from_email, to_email))
+
+
+def _start_email_worker():
+    """Start the background sender thread if it isn't running yet."""
+    global _email_worker
+    with _email_worker_lock:
+        if _email_worker is None:
+            _email_worker = threading.Thread(target=_email_worker_loop, name="email-sender", daemon=True)
+            _email_worker.start()
+
+
+def _email_worker_loop():
+    """Send queued emails one at a time, forever, closing the SMTP connection when idle."""
+    while True:
+        try:
+            subject, content, from_email, to_email = _email_queue.get(timeout=_SMTP_IDLE_SECONDS)
+        except queue.Empty:
+            close_smtp_connection()
+            continue
+        send_email(subject, content, from_email, to_email)
+        _email_queue.task_done()
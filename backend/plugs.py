@@ -1,28 +1,38 @@
 from __future__ import annotations
 
 import configparser
-import json
 import logging
 import re
 import threading
 import time
+from dataclasses import replace
 from datetime import datetime
+from operator import itemgetter
 
+import orjson
 from PyP100 import PyP100, MeasureInterval
 
-from config import CONFIG_FILE_PATH, PLUG_STATES_FILE_PATH, config, TIMEZONE
+from config import PLUG_STATES_FILE_PATH, config, TIMEZONE
 
 logger = logging.getLogger("uvicorn.error")
 from scheduling import (
     create_strategy,
+    index_prices_by_hour,
     PeriodConfig,
     PeriodStrategyData,
+    prices_in_window,
     ValleyDetectionStrategyData,
 )
 
 
+# Config parsing patterns, compiled once
+_HUMAN_TIME_RE = re.compile(r"(\d+[h|m|s]?)(\d+[h|m|s]?)?(\d+[h|m|s]?)?")
+_PERIOD_HOUR_KEY_RE = re.compile(r'period(\d+)_(start|end)_hour')
+_PERIOD_RUNTIME_KEY_RE = re.compile(r'period(\d+)_runtime_human')
+
+
 def human_time_to_seconds(human_time):
-    match = re.match(r"(\d+[h|m|s]?)(\d+[h|m|s]?)?(\d+[h|m|s]?)?", human_time)
+    match = _HUMAN_TIME_RE.match(human_time)
     if not match:
         return 0
     h = match.group(1)
@@ -34,6 +44,11 @@ def human_time_to_seconds(human_time):
     return hours * 3600 + minutes * 60 + seconds
 
 
+def _plug_config_key(plug_config: configparser.SectionProxy, email: str, password: str) -> tuple:
+    """Build a hashable key from everything a Plug is constructed from."""
+    return tuple(plug_config.items()), email, password
+
+
 class Plug:
     def __init__(self, plug_config: configparser.SectionProxy, email: str, password: str, automatic_schedules: bool = True):
         self.name = plug_config.get('name')
@@ -44,6 +59,8 @@ class Plug:
         self.tapo = PyP100.Switchable(self.address, email, password)
         self._lock = threading.Lock()
         self._session_initialized = False
+        # Identifies the config this plug was built from, to reuse it on reload
+        self.config_key = _plug_config_key(plug_config, email, password)
 
         # Load scheduling strategy (None if not set)
         strategy_name = plug_config.get('strategy')
@@ -129,12 +146,12 @@ class Plug:
         """Parse period-based strategy configuration."""
         periods_temp = {}
         for key, val in plug_config.items():
-            m = re.match(r'period(\d+)_(start|end)_hour', key)
+            m = _PERIOD_HOUR_KEY_RE.match(key)
             if m:
                 idx = int(m.group(1))
                 field = 'start_hour' if m.group(2) == 'start' else 'end_hour'
                 periods_temp.setdefault(idx, {})[field] = int(val)
-            m2 = re.match(r'period(\d+)_runtime_human', key)
+            m2 = _PERIOD_RUNTIME_KEY_RE.match(key)
             if m2:
                 idx = int(m2.group(1))
                 periods_temp.setdefault(idx, {})['runtime_human'] = val
@@ -194,50 +211,58 @@ class Plug:
         )
 
     def calculate_target_hours(self, prices: list[tuple[int, float]]):
-        """Calculate target hours using the configured strategy."""
+        """Calculate target hours using the configured strategy.
+
+        Results go into a new strategy data object that replaces the old one in
+        a single assignment, so threads reading plug.strategy_data concurrently
+        never see half-updated targets.
+        """
         if not prices or self.strategy is None:
             return
 
+        strategy_data = self.strategy_data
+
         # Use strategy to calculate target hours
-        target_hours = self.strategy.calculate_target_hours(prices, self.strategy_data)
+        target_hours = self.strategy.calculate_target_hours(prices, strategy_data)
 
         if self.strategy_name == 'valley_detection':
             # For valley detection, store target hours in strategy data
-            if not isinstance(self.strategy_data, ValleyDetectionStrategyData):
-                logger.error(f"Invalid strategy data type for valley_detection [type={type(self.strategy_data)}]")
+            if not isinstance(strategy_data, ValleyDetectionStrategyData):
+                logger.error(f"Invalid strategy data type for valley_detection [type={type(strategy_data)}]")
                 return
 
             if target_hours:
                 # Find the price for each target hour
                 hour_prices = {h: p for h, p in prices}
-                self.strategy_data.target_hours = target_hours
-                self.strategy_data.target_prices = {h: hour_prices.get(h, 0) for h in target_hours}
+                self.strategy_data = replace(
+                    strategy_data,
+                    target_hours=target_hours,
+                    target_prices={h: hour_prices.get(h, 0) for h in target_hours}
+                )
 
                 avg_price = self.strategy_data.get_average_price()
                 logger.info(f"Valley detection calculated targets [plug_name={self.name}, hours={target_hours}, avg_price={avg_price:.4f}]")
             else:
-                self.strategy_data.target_hours = []
-                self.strategy_data.target_prices = {}
+                self.strategy_data = replace(strategy_data, target_hours=[], target_prices={})
 
         else:
             # For period strategy, map target hours back to periods
-            if not isinstance(self.strategy_data, PeriodStrategyData):
-                logger.error(f"Invalid strategy data type for period [type={type(self.strategy_data)}]")
+            if not isinstance(strategy_data, PeriodStrategyData):
+                logger.error(f"Invalid strategy data type for period [type={type(strategy_data)}]")
                 return
 
-            for period in self.strategy_data.periods:
-                start_hour = period.start_hour
-                end_hour = period.end_hour
+            # Index prices by hour once, each period then only reads its own hours
+            price_by_hour = index_prices_by_hour(prices)
 
-                # Find cheapest hour in this period
-                period_prices = [(h, p) for h, p in prices if start_hour <= h <= end_hour]
-                if period_prices:
-                    target_hour, target_price = min(period_prices, key=lambda x: x[1])
-                    period.target_hour = target_hour
-                    period.target_price = target_price
-                else:
-                    period.target_hour = None
-                    period.target_price = None
+            periods = []
+            for period in strategy_data.periods:
+                target_hour, target_price = min(
+                    prices_in_window(price_by_hour, period.start_hour, period.end_hour),
+                    key=itemgetter(1),
+                    default=(None, None)
+                )
+                periods.append(replace(period, target_hour=target_hour, target_price=target_price))
+            self.strategy_data = replace(strategy_data, periods=periods)
 
     def get_rule_remain_seconds(self):
         """Get remaining seconds on active countdown rule. Must be called under lock."""
@@ -295,13 +320,24 @@ class Plug:
         base_ts = resp.get('start_timestamp', start_ts)
         interval_min = resp.get('interval', 60)
         step = interval_min * 60
-        out = []
-        for i, val in enumerate(raw):
-            ts = base_ts + i * step
-            hr = datetime.fromtimestamp(ts, tz=TIMEZONE).hour
-            kwh = val / 1000
-            out.append({'hour': hr, 'value': kwh})
-        return out
+        if not raw:
+            return []
+
+        # Within one UTC offset, local hours follow from plain arithmetic. Only on
+        # DST change days is each sample converted through the timezone.
+        last_ts = base_ts + (len(raw) - 1) * step
+        offset = datetime.fromtimestamp(base_ts, tz=TIMEZONE).utcoffset()
+        if offset == datetime.fromtimestamp(last_ts, tz=TIMEZONE).utcoffset():
+            local_base = base_ts + int(offset.total_seconds())
+            return [
+                {'hour': (local_base + i * step) // 3600 % 24, 'value': val / 1000}
+                for i, val in enumerate(raw)
+            ]
+
+        return [
+            {'hour': datetime.fromtimestamp(base_ts + i * step, tz=TIMEZONE).hour, 'value': val / 1000}
+            for i, val in enumerate(raw)
+        ]
 
     def get_current_power(self):
         """Get current power consumption in kW. Must be called under lock."""
@@ -339,20 +375,51 @@ class Plug:
         self._execute_operation(self.tapo.turnOffWithDelay, delay_seconds)
         logger.info(f"Set plug to turn OFF after delay [plug_name={self.name}, delay={delay_seconds}s]")
 
+    def execute_scheduled(self, desired_state: bool, duration_seconds: int | None = None):
+        """Apply a scheduled state change in one locked sequence.
+
+        Cancels countdown rules, switches to the desired state and, when a
+        duration is given, sets a countdown back to the opposite state.
+        Acquires the plug lock itself, so it must not be called under it.
+        """
+        with self._lock:
+            # Cancel all countdown timers first to avoid Tapo API errors
+            self.cancel_countdown_rules()
+
+            if desired_state:
+                self.turn_on()
+            else:
+                self.turn_off()
+
+            if duration_seconds and duration_seconds > 0:
+                if desired_state:
+                    self.turn_off_with_delay(duration_seconds)
+                else:
+                    self.turn_on_with_delay(duration_seconds)
+
 
 class PlugManager:
     """Manages shared plug instances that are used by both API and manager thread."""
 
     def __init__(self):
         self._plugs: list[Plug] = []
+        self._plugs_by_address: dict[str, Plug] = {}
         self._lock = threading.Lock()
 
     def reload_plugs(self):
-        """Reload plugs from config file. Thread-safe."""
-        config.read(CONFIG_FILE_PATH)
+        """Reload plugs from the loaded config. Thread-safe.
+
+        The caller reads the config file first, only when its mtime changes.
+        Plugs whose config section and credentials are unchanged are kept, so
+        they keep their Tapo session and calculated target hours.
+        """
         tapo_email = config.get('credentials', 'tapo_email')
         tapo_password = config.get('credentials', 'tapo_password')
         new_plugs = []
+        reused = 0
+
+        with self._lock:
+            previous = {p.config_key: p for p in self._plugs}
 
         for section in config.sections():
             if section.startswith("plug"):
@@ -360,12 +427,24 @@ class PlugManager:
                 if not address:
                     continue
                 automatic = is_plug_automatic(address)
-                new_plugs.append(Plug(config[section], tapo_email, tapo_password, automatic))
+                plug = previous.pop(_plug_config_key(config[section], tapo_email, tapo_password), None)
+                if plug:
+                    plug.automatic_schedules = automatic
+                    reused += 1
+                else:
+                    plug = Plug(config[section], tapo_email, tapo_password, automatic)
+                new_plugs.append(plug)
+
+        # Index by address, the first plug wins if an address is repeated
+        plugs_by_address = {}
+        for plug in new_plugs:
+            plugs_by_address.setdefault(plug.address, plug)
 
         with self._lock:
             self._plugs = new_plugs
+            self._plugs_by_address = plugs_by_address
 
-        logger.info(f"Reloaded plugs from config [count={len(new_plugs)}]")
+        logger.info(f"Reloaded plugs from config [count={len(new_plugs)}, reused={reused}]")
 
     def get_plugs(self, automatic_only=False) -> list[Plug]:
         """Get current plugs. Thread-safe read."""
@@ -377,10 +456,7 @@ class PlugManager:
     def get_plug_by_address(self, address: str) -> Plug | None:
         """Get a specific plug by address. Thread-safe."""
         with self._lock:
-            for p in self._plugs:
-                if p.address == address:
-                    return p
-        return None
+            return self._plugs_by_address.get(address)
 
 
 # Global plug manager instance (shared between API and manager thread)
@@ -390,16 +466,16 @@ plug_manager = PlugManager()
 def _load_plug_states():
     """Load plug states from JSON file. True = automatic schedules enabled, False = manual mode."""
     try:
-        with open(PLUG_STATES_FILE_PATH, 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
+        with open(PLUG_STATES_FILE_PATH, 'rb') as f:
+            return orjson.loads(f.read())
+    except (FileNotFoundError, orjson.JSONDecodeError):
         return {}
 
 
 def _save_plug_states(states):
     """Save plug states to JSON file."""
-    with open(PLUG_STATES_FILE_PATH, 'w') as f:
-        json.dump(states, f, indent=2)
+    with open(PLUG_STATES_FILE_PATH, 'wb') as f:
+        f.write(orjson.dumps(states, option=orjson.OPT_INDENT_2))
 
 
 def is_plug_automatic(address: str) -> bool:
@@ -1,34 +1,54 @@
+import os
+import re
+import threading
 import time
+from collections import OrderedDict
+import orjson
 import requests
 import logging
 from datetime import datetime, timedelta, timezone
 from abc import ABC, abstractmethod
-from functools import wraps
 
 logger = logging.getLogger("uvicorn.error")
 
-
-def cached_prices(func):
-    """Decorator to cache price results by date"""
-
-    @wraps(func)
-    def wrapper(self, target_date: datetime, *args, **kwargs):
-        cache_key = f"{target_date.strftime('%Y%m%d')}"
-
-        if not hasattr(self, '_prices_cache'):
-            self._prices_cache = {}
-
-        if cache_key in self._prices_cache:
-            logger.info(f"Cache hit [key={cache_key}]")
-            return self._prices_cache[cache_key]
-
-        result = func(self, target_date, *args, **kwargs)
-
-        self._prices_cache[cache_key] = result
-
-        return result
-
-    return wrapper
+# Parsed prices are also kept on disk, so a restart doesn't download them again.
+# Defined here rather than next to the data paths in config.py, which imports this module.
+PRICES_CACHE_DIR = "data/prices"
+PRICES_CACHE_MAX_DAYS = 7  # Days kept both in memory and on disk
+
+# OMIE line b"YYYY;MM;DD;quarter;price_pt;price_es;": captures date, quarter and Spanish price
+_QUARTER_LINE_RE = re.compile(rb'(\d{4};\d{2};\d{2});(\d+);[^;]*;([^;]*)')
+
+
+def _load_disk_prices(cache_key: str) -> list[tuple[int, float]] | None:
+    """Load cached prices for a date key from disk, None if missing or unreadable."""
+    try:
+        with open(os.path.join(PRICES_CACHE_DIR, f"{cache_key}.json"), 'rb') as f:
+            return [(hour, price) for hour, price in orjson.loads(f.read())]
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, TypeError) as e:
+        # ValueError covers invalid JSON, TypeError a file that isn't a list of pairs
+        logger.warning(f"Failed to read prices cache [key={cache_key}, error={e}]")
+        return None
+
+
+def _store_disk_prices(cache_key: str, prices: list[tuple[int, float]]):
+    """Write prices for a date key to disk and drop all but the most recent files."""
+    try:
+        os.makedirs(PRICES_CACHE_DIR, exist_ok=True)
+        path = os.path.join(PRICES_CACHE_DIR, f"{cache_key}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps(prices))
+        os.replace(tmp_path, path)
+
+        # Keys are YYYYMMDD, so name order is date order
+        names = sorted(entry.name for entry in os.scandir(PRICES_CACHE_DIR) if entry.name.endswith('.json'))
+        for name in names[:-PRICES_CACHE_MAX_DAYS]:
+            os.remove(os.path.join(PRICES_CACHE_DIR, name))
+    except OSError as e:
+        logger.warning(f"Failed to write prices cache [key={cache_key}, error={e}]")
 
 
 class PricesProvider(ABC):
@@ -42,53 +62,89 @@ class PricesProvider(ABC):
 
 
 class OmieProvider(PricesProvider):
-    BASE_URL = "https://www.omie.es/es/file-download?parents=marginalpdbc&filename=marginalpdbc_{date}.1"
+    # File URL is URL_PREFIX + YYYYMMDD + URL_SUFFIX
+    URL_PREFIX = "https://www.omie.es/es/file-download?parents=marginalpdbc&filename=marginalpdbc_"
+    URL_SUFFIX = ".1"
     MAX_RETRIES = 3
     RETRY_TIME_SECONDS = 5
 
     def __init__(self):
         self.unavailable_until = None
+        self._prices_cache: OrderedDict[str, list[tuple[int, float]]] = OrderedDict()
+        # Keep the HTTPS connection to OMIE alive across retries and daily fetches
+        self._session = requests.Session()
+        # Guards the cache and the session, get_prices runs on API and manager threads
+        self._lock = threading.Lock()
 
     def unavailable(self):
         return self.unavailable_until is not None and datetime.now(timezone.utc) < self.unavailable_until
 
-    @cached_prices
     def get_prices(self, target_date: datetime) -> list[tuple[int, float]]:
+        """Get hourly prices for a date, from memory, then disk, then OMIE. Thread-safe."""
+        with self._lock:
+            return self._get_prices_locked(target_date)
+
+    def _get_prices_locked(self, target_date: datetime) -> list[tuple[int, float]]:
+        """Get prices through the caches. Must be called under _lock."""
+        cache_key = target_date.strftime('%Y%m%d')
+        cache = self._prices_cache
+
+        if cache_key in cache:
+            logger.info(f"Cache hit [key={cache_key}]")
+            cache.move_to_end(cache_key)
+            return cache[cache_key]
+
+        result = _load_disk_prices(cache_key)
+        if result:
+            logger.info(f"Disk cache hit [key={cache_key}]")
+        else:
+            result = self._fetch_prices(target_date)
+            if result:
+                _store_disk_prices(cache_key, result)
+
+        cache[cache_key] = result
+        if len(cache) > PRICES_CACHE_MAX_DAYS:
+            cache.popitem(last=False)
+
+        return result
+
+    def _fetch_prices(self, target_date: datetime) -> list[tuple[int, float]]:
+        """Download and parse the OMIE marginal prices file, retrying on failure."""
         if self.unavailable():
             return []
         else:
             self.unavailable_until = None
 
-        target_date_string = target_date.strftime("%Y%m%d")
-        hourly_prices = []
-        retries = 0
+        url = self.URL_PREFIX + target_date.strftime("%Y%m%d") + self.URL_SUFFIX
+        line_date = target_date.strftime("%Y;%m;%d").encode('ascii')
 
-        # Retry loop: keep trying every 15s until we fetch and parse successfully
-        while True:
+        # Bounded retry loop, the provider backs off for 15 minutes once all attempts fail
+        for attempt in range(1, self.MAX_RETRIES + 1):
             try:
-                response = requests.get(self.BASE_URL.format(date=target_date_string), timeout=10)
-                response.raise_for_status()
-                file_content = response.text
-
-                quarter_prices = []
-                for line in file_content.splitlines():
-                    if line.startswith(target_date.strftime("%Y;%m;%d")):
-                        parts = line.split(";")
-                        quarter = int(parts[3]) - 1  # Convert 1-based quarter to 0-based (1->0, 2->1, 3->2, 4->3, etc.)
-                        price = round(float(parts[5]) / 1000, 3)
-                        quarter_prices.append((quarter, price))
+                quarter_prices = {}
+                with self._session.get(url, timeout=10, stream=True) as response:
+                    response.raise_for_status()
+
+                    # Read the raw ASCII file line by line, all target date lines are consecutive
+                    for line in response.iter_lines():
+                        match = _QUARTER_LINE_RE.match(line)
+                        if match and match[1] == line_date:
+                            # int() and float() accept the ASCII bytes directly
+                            quarter = int(match[2]) - 1  # Convert 1-based quarter to 0-based
+                            price = round(float(match[3]) / 1000, 3)
+                            quarter_prices.setdefault(quarter, price)  # Keep the first price of a quarter
+                        elif line and quarter_prices:
+                            break
 
                 if not quarter_prices:
                     raise ValueError("No quarter prices found")
 
-                # Normalize to 24 hours: take first quarter of each hour
-                for hour in range(24):
-                    first_quarter_of_hour = hour * 4  # Each hour has 4 quarters
-                    # Find the price for the first quarter of this hour
-                    for quarter, price in quarter_prices:
-                        if quarter == first_quarter_of_hour:
-                            hourly_prices.append((hour, price))
-                            break
+                # Normalize to 24 hours: take first quarter of each hour (each hour has 4 quarters)
+                hourly_prices = [
+                    (hour, quarter_prices[hour * 4])
+                    for hour in range(24)
+                    if hour * 4 in quarter_prices
+                ]
 
                 if not hourly_prices:
                     raise ValueError("No hourly prices found after normalization")
@@ -96,10 +152,8 @@ class OmieProvider(PricesProvider):
                 return hourly_prices
             except Exception as e:
                 logger.error(f"Failed to fetch/parse prices, retrying [error={e}, retry_in_seconds={self.RETRY_TIME_SECONDS}]")
-                retries += 1
-                if retries >= self.MAX_RETRIES:
-                    break
-                time.sleep(self.RETRY_TIME_SECONDS)
+                if attempt < self.MAX_RETRIES:
+                    time.sleep(self.RETRY_TIME_SECONDS)
 
         self.unavailable_until = datetime.now(timezone.utc) + timedelta(minutes=15)
         logger.error(f"Failed to fetch prices after retries [max_retries={self.MAX_RETRIES}, unavailable_until={self.unavailable_until}]")
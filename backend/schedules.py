@@ -1,9 +1,16 @@
 from __future__ import annotations
 
-import json
+import heapq
 import logging
+import os
+import threading
 import uuid
-from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache, wraps
+from itertools import groupby
+
+import orjson
 
 from config import (
     RETRY_BASE_DELAY_SECONDS,
@@ -15,36 +22,204 @@ from config import (
 
 logger = logging.getLogger("uvicorn.error")
 from email_templates import render_schedule_execution_email
-from notifications import send_email
+from notifications import queue_email
 from plugs import Plug, plug_manager
 from recurrence import calculate_next_occurrence, format_recurrence_pattern, validate_recurrence
 from scheduling import PeriodStrategyData, ValleyDetectionStrategyData
 
+# Exponential backoff delays indexed by retry count (capped at RETRY_MAX_DELAY_SECONDS)
+_RETRY_DELAYS = tuple(
+    timedelta(seconds=min(RETRY_BASE_DELAY_SECONDS * (1 << i), RETRY_MAX_DELAY_SECONDS))
+    for i in range(32)
+)
+
+_RETRY_WINDOW = timedelta(hours=RETRY_WINDOW_HOURS)
+_CLEANUP_AGE = timedelta(days=7)
+
+# Upper bound on plugs driven at once when several have events due in the same tick
+_MAX_PARALLEL_PLUGS = 8
+
+
+# In-memory copy of the events file, reused while the file's mtime is unchanged.
+# Guarded by _events_lock, which every public function below holds.
+_events_lock = threading.RLock()
+_events_cache: list[dict] | None = None
+_events_cache_mtime: int | None = None
+
+# Indexes over the cached events, rebuilt whenever the cache changes
+_events_by_id: dict[str, dict] = {}
+_pending_events: list[dict] = []  # pending events in file order
+_pending_queue: list[tuple[datetime, str]] = []  # min-heap of (due time, event id)
+_cleanup_due_at: datetime | None = None  # when the oldest finished event reaches _CLEANUP_AGE
+_next_wakeup: datetime | None = None  # earliest time process_scheduled_events has work to do
+
+
+def _with_events_lock(func):
+    """Decorator serializing access to the events store (API threads and manager thread).
+
+    Callers change the cached events in place before saving, so if the call
+    fails the cache is dropped and the next call reloads the file from disk.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        global _events_cache
+        with _events_lock:
+            try:
+                return func(*args, **kwargs)
+            except BaseException:
+                _events_cache = None
+                raise
+
+    return wrapper
+
 
 def _load_scheduled_events():
-    """Load all scheduled events from JSON file."""
+    """Load all scheduled events, parsing the JSON file only when it changed.
+
+    The returned list is the shared cache: callers must hold _events_lock and
+    save any changes they make to it.
+    """
+    global _events_cache, _events_cache_mtime
     try:
-        with open(SCHEDULED_FILE_PATH, 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
+        mtime = os.stat(SCHEDULED_FILE_PATH).st_mtime_ns
+        if _events_cache is not None and mtime == _events_cache_mtime:
+            return _events_cache
+        with open(SCHEDULED_FILE_PATH, 'rb') as f:
+            events = orjson.loads(f.read())
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        events = []
+        mtime = None
+
+    _events_cache = events
+    _events_cache_mtime = mtime
+    _index_events(events)
+    return events
 
 
 def _save_scheduled_events(events):
-    """Save scheduled events to JSON file."""
-    with open(SCHEDULED_FILE_PATH, 'w') as f:
-        json.dump(events, f, indent=2)
+    """Save scheduled events to JSON file and refresh the in-memory cache.
+
+    Writes compact JSON to a temporary file, syncs it to disk and renames it
+    over the original, so a crash never leaves a truncated schedules file.
+    """
+    global _events_cache, _events_cache_mtime
+    data = orjson.dumps(events)
+    tmp_path = f"{SCHEDULED_FILE_PATH}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, SCHEDULED_FILE_PATH)
+    _events_cache = events
+    _events_cache_mtime = os.stat(SCHEDULED_FILE_PATH).st_mtime_ns
+    _index_events(events)
+
+
+def _index_events(events: list[dict]):
+    """Rebuild the id index, the pending event list and queue, and the next wakeup."""
+    global _events_by_id, _pending_events, _pending_queue, _cleanup_due_at, _next_wakeup
+    _events_by_id = {e['id']: e for e in events}
+    pending = []
+    queue = []
+    oldest_stamp = None
+    for e in events:
+        if e['status'] == 'pending':
+            pending.append(e)
+            queue.append((min(_event_times(e)), e['id']))
+            continue
+        stamp = _event_stamp(e)
+        if stamp and (oldest_stamp is None or _parse_datetime(stamp) < oldest_stamp):
+            oldest_stamp = _parse_datetime(stamp)
+    heapq.heapify(queue)
+    _pending_events = pending
+    _pending_queue = queue
+
+    # Wake up for the first due event or when the oldest finished event ages out
+    _cleanup_due_at = oldest_stamp + _CLEANUP_AGE if oldest_stamp is not None else None
+    wakeups = [queue[0][0]] if queue else []
+    if _cleanup_due_at is not None:
+        wakeups.append(_cleanup_due_at)
+    _next_wakeup = min(wakeups) if wakeups else None
+
+
+def _event_stamp(event: dict) -> str | None:
+    """Get the timestamp used to age out a finished event."""
+    return event.get('created_at') or event.get('cancelled_at') or event.get('executed_at')
+
+
+def _event_times(event: dict) -> tuple[datetime, datetime]:
+    """Get when a pending event should execute and when its retry window ends."""
+    target_dt = _parse_datetime(event['target_datetime'])
+    next_retry_at = event.get('next_retry_at')
+    execute_time = _parse_datetime(next_retry_at) if next_retry_at else target_dt
+    return execute_time, target_dt + _RETRY_WINDOW
 
 
 def _calculate_next_retry_time(retry_count: int, now: datetime) -> datetime:
     """Calculate next retry time using exponential backoff."""
-    delay = min(
-        RETRY_BASE_DELAY_SECONDS * (2 ** retry_count),
-        RETRY_MAX_DELAY_SECONDS
+    return now + _RETRY_DELAYS[min(retry_count, len(_RETRY_DELAYS) - 1)]
+
+
+def _build_event(plug_address: str, plug_name: str, target_dt: datetime, desired_state: bool,
+                 duration_seconds: int | None, event_type: str, created_at: str, **extra) -> dict:
+    """Build a new pending event dict.
+
+    Args:
+        target_dt: When to execute, must already be in UTC
+        desired_state: True = turn ON, False = turn OFF
+        event_type: "manual", "automatic" or "repeating"
+        created_at: ISO creation timestamp, shared by events created together
+        **extra: Type-specific fields (source_period, recurrence)
+    """
+    return {
+        'id': str(uuid.uuid4()),
+        'plug_address': plug_address,
+        'plug_name': plug_name,
+        'target_datetime': target_dt.isoformat(),  # Always stored as UTC
+        'desired_state': desired_state,
+        'duration_seconds': duration_seconds,
+        'type': event_type,
+        **extra,
+        'status': 'pending',
+        'created_at': created_at,
+    }
+
+
+@lru_cache(maxsize=4096)
+def _parse_datetime(value: str) -> datetime:
+    """Parse a stored ISO datetime string.
+
+    Stored timestamps never change once written, and every tick re-reads the
+    same ones, so parsed values are memoized (datetimes are immutable).
+    """
+    return datetime.fromisoformat(value)
+
+
+@lru_cache(maxsize=256)
+def _format_duration(duration_seconds: int) -> str:
+    """Format a duration as "1h 30m", "2h" or "45m" (cached, runtimes repeat across events)."""
+    duration_td = timedelta(seconds=duration_seconds)
+    hours = duration_td.seconds // 3600
+    minutes = (duration_td.seconds % 3600) // 60
+    if hours > 0 and minutes > 0:
+        return f"{hours}h {minutes}m"
+    elif hours > 0:
+        return f"{hours}h"
+    return f"{minutes}m"
+
+
+def _is_future_pending_automatic(event: dict, now: datetime) -> bool:
+    """Check if an event is an automatic schedule still waiting to run at or after now."""
+    # Cheapest checks first, most stored events are no longer pending
+    return (
+        event['status'] == 'pending'
+        and event.get('type') == 'automatic'
+        and _parse_datetime(event['target_datetime']) >= now
     )
-    return now + timedelta(seconds=delay)
 
 
+@_with_events_lock
 def clear_automatic_schedules(plug_address: str):
     """Clear all pending automatic schedules for a specific plug.
 
@@ -55,18 +230,17 @@ def clear_automatic_schedules(plug_address: str):
     now = datetime.now(timezone.utc)
 
     # Filter out pending automatic schedules for this plug
-    events = [
+    remaining = [
         e for e in events
-        if not (e.get('plug_address') == plug_address and
-                e.get('type') == 'automatic' and
-                e['status'] == 'pending' and
-                datetime.fromisoformat(e['target_datetime']) >= now)
+        if not (e.get('plug_address') == plug_address and _is_future_pending_automatic(e, now))
     ]
 
-    _save_scheduled_events(events)
+    if len(remaining) != len(events):
+        _save_scheduled_events(remaining)
     logger.info(f"Cleared automatic schedules [plug_address={plug_address}]")
 
 
+@_with_events_lock
 def create_scheduled_event(plug_address: str, plug_name: str, target_datetime: str, desired_state: bool, duration_seconds: int | None = None, event_type: str = "manual", source_period: int | None = None):
     """Create a new scheduled event for a plug.
 
@@ -81,33 +255,27 @@ def create_scheduled_event(plug_address: str, plug_name: str, target_datetime: s
     """
     events = _load_scheduled_events()
 
-    # Normalize target_datetime to UTC
+    # Normalize target_datetime to UTC (parsing also validates the input)
     target_dt = datetime.fromisoformat(target_datetime)
     if target_dt.tzinfo is None:
         # Assume UTC if no timezone info
         target_dt = target_dt.replace(tzinfo=timezone.utc)
-    else:
-        # Convert to UTC
+    elif target_dt.utcoffset():
+        # Convert to UTC, offset-aware UTC input ("Z" / "+00:00") is kept as is
         target_dt = target_dt.astimezone(timezone.utc)
 
-    event = {
-        'id': str(uuid.uuid4()),
-        'plug_address': plug_address,
-        'plug_name': plug_name,
-        'target_datetime': target_dt.isoformat(),  # Always stored as UTC
-        'desired_state': desired_state,  # True = ON, False = OFF
-        'duration_seconds': duration_seconds,
-        'type': event_type,  # "manual" or "automatic"
-        'source_period': source_period,  # For automatic events
-        'status': 'pending',
-        'created_at': datetime.now(timezone.utc).isoformat()
-    }
+    event = _build_event(
+        plug_address, plug_name, target_dt, desired_state, duration_seconds,
+        event_type, datetime.now(timezone.utc).isoformat(),
+        source_period=source_period,  # For automatic events
+    )
     events.append(event)
     _save_scheduled_events(events)
     logger.info(f"Created scheduled event [event_type={event_type}, event={event}]")
-    return event
+    return dict(event)
 
 
+@_with_events_lock
 def create_repeating_schedule(plug_address: str, plug_name: str, recurrence: dict, desired_state: bool, duration_seconds: int | None = None) -> dict | None:
     """Create a new repeating schedule for a plug.
 
@@ -143,25 +311,18 @@ def create_repeating_schedule(plug_address: str, plug_name: str, recurrence: dic
     # Add parent_id to recurrence config
     recurrence_with_parent = {**recurrence, 'parent_id': parent_id}
 
-    event = {
-        'id': str(uuid.uuid4()),
-        'plug_address': plug_address,
-        'plug_name': plug_name,
-        'target_datetime': first_occurrence.isoformat(),
-        'desired_state': desired_state,
-        'duration_seconds': duration_seconds,
-        'type': 'repeating',
-        'recurrence': recurrence_with_parent,
-        'status': 'pending',
-        'created_at': now.isoformat()
-    }
+    event = _build_event(
+        plug_address, plug_name, first_occurrence, desired_state, duration_seconds,
+        'repeating', now.isoformat(),
+        recurrence=recurrence_with_parent,
+    )
 
     events.append(event)
     _save_scheduled_events(events)
 
     pattern = format_recurrence_pattern(recurrence)
     logger.info(f"Created repeating schedule [plug_name={plug_name}, pattern={pattern}, first_occurrence={first_occurrence}]")
-    return event
+    return dict(event)
 
 
 def _generate_next_occurrence(completed_event: dict) -> dict | None:
@@ -178,53 +339,47 @@ def _generate_next_occurrence(completed_event: dict) -> dict | None:
         return None
 
     # Calculate next occurrence after the completed event's target time
-    completed_time = datetime.fromisoformat(completed_event['target_datetime'])
+    completed_time = _parse_datetime(completed_event['target_datetime'])
     next_occurrence = calculate_next_occurrence(recurrence, completed_time)
 
     if next_occurrence is None:
         logger.info(f"No more occurrences for repeating schedule [plug_name={completed_event['plug_name']}, parent_id={recurrence.get('parent_id')}]")
         return None
 
-    now = datetime.now(timezone.utc)
-
-    new_event = {
-        'id': str(uuid.uuid4()),
-        'plug_address': completed_event['plug_address'],
-        'plug_name': completed_event['plug_name'],
-        'target_datetime': next_occurrence.isoformat(),
-        'desired_state': completed_event['desired_state'],
-        'duration_seconds': completed_event.get('duration_seconds'),
-        'type': 'repeating',
-        'recurrence': recurrence,
-        'status': 'pending',
-        'created_at': now.isoformat()
-    }
+    new_event = _build_event(
+        completed_event['plug_address'], completed_event['plug_name'], next_occurrence,
+        completed_event['desired_state'], completed_event.get('duration_seconds'),
+        'repeating', datetime.now(timezone.utc).isoformat(),
+        recurrence=recurrence,
+    )
 
     logger.info(f"Generated next occurrence [plug_name={completed_event['plug_name']}, next_time={next_occurrence}]")
     return new_event
 
 
+@_with_events_lock
 def get_scheduled_events(plug_address: str | None = None):
     """Get all scheduled events, optionally filtered by plug address."""
-    events = _load_scheduled_events()
-    if plug_address:
-        events = [e for e in events if e['plug_address'] == plug_address]
-    return [e for e in events if e['status'] == 'pending']
+    _load_scheduled_events()
+    return [dict(e) for e in _pending_events if not plug_address or e['plug_address'] == plug_address]
 
 
+@_with_events_lock
 def delete_scheduled_event(event_id: str):
     """Delete a scheduled event by ID."""
     events = _load_scheduled_events()
-    for event in events:
-        if event['id'] == event_id:
-            event['status'] = 'cancelled'
-            event['cancelled_at'] = datetime.now(timezone.utc).isoformat()
-            logger.info(f"Cancelled scheduled event [event={event}]")
-            _save_scheduled_events(events)
-            return True
-    return False
+    event = _events_by_id.get(event_id)
+    if event is None:
+        return False
 
+    event['status'] = 'cancelled'
+    event['cancelled_at'] = datetime.now(timezone.utc).isoformat()
+    logger.info(f"Cancelled scheduled event [event={event}]")
+    _save_scheduled_events(events)
+    return True
 
+
+@_with_events_lock
 def delete_repeating_schedule(parent_id: str) -> bool:
     """Cancel all pending events for a repeating schedule series.
 
@@ -254,6 +409,7 @@ def delete_repeating_schedule(parent_id: str) -> bool:
     return False
 
 
+@_with_events_lock
 def get_repeating_schedules(plug_address: str | None = None) -> list[dict]:
     """Get unique repeating schedule definitions.
 
@@ -266,13 +422,10 @@ def get_repeating_schedules(plug_address: str | None = None) -> list[dict]:
     Returns:
         List of repeating schedule events (one per series)
     """
-    events = _load_scheduled_events()
+    _load_scheduled_events()
 
     # Filter to repeating pending events
-    repeating = [
-        e for e in events
-        if e.get('type') == 'repeating' and e['status'] == 'pending'
-    ]
+    repeating = [e for e in _pending_events if e.get('type') == 'repeating']
 
     if plug_address:
         repeating = [e for e in repeating if e['plug_address'] == plug_address]
@@ -286,165 +439,231 @@ def get_repeating_schedules(plug_address: str | None = None) -> list[dict]:
                 by_parent[parent_id] = event
             else:
                 # Keep the one with earlier target_datetime
-                existing_dt = datetime.fromisoformat(by_parent[parent_id]['target_datetime'])
-                event_dt = datetime.fromisoformat(event['target_datetime'])
+                existing_dt = _parse_datetime(by_parent[parent_id]['target_datetime'])
+                event_dt = _parse_datetime(event['target_datetime'])
                 if event_dt < existing_dt:
                     by_parent[parent_id] = event
 
-    return list(by_parent.values())
+    return [dict(e) for e in by_parent.values()]
 
 
 def process_scheduled_events(manager_from_email: str | None = None, manager_to_email: str | None = None):
     """Process pending scheduled events and execute if time has arrived.
 
+    Due events are taken under the events lock, but the plug operations run
+    with it released, so slow Tapo retries don't block the API meanwhile.
+
     Args:
         manager_from_email: Optional sender email for notifications
         manager_to_email: Optional recipient email for notifications
     """
-    events = _load_scheduled_events()
     now = datetime.now(timezone.utc)
-    modified = False
+    taken = _take_due_events(now)
+    if taken is None:
+        return
+    expired, due_by_plug = taken
 
-    for event in events:
+    results = []
+    try:
+        if due_by_plug:
+            # Plugs are independent devices, so their events run in parallel while
+            # events of the same plug stay sequential, in due order
+            with ThreadPoolExecutor(max_workers=min(len(due_by_plug), _MAX_PARALLEL_PLUGS)) as executor:
+                futures = {
+                    plug_address: executor.submit(_execute_plug_events, plug_address, plug_events, now, manager_from_email, manager_to_email)
+                    for plug_address, plug_events in due_by_plug.items()
+                }
+                for plug_address, future in futures.items():
+                    try:
+                        results.extend(future.result())
+                    except Exception as err:
+                        # The plug's events stay pending and run again on the next tick
+                        logger.error(f"Failed to process scheduled events [plug_address={plug_address}, error={type(err).__name__}: {err}]")
+    finally:
+        # Always apply what ran, which also puts popped events back in the queue
+        _apply_processed_events(expired, results, now)
+
+
+@_with_events_lock
+def _take_due_events(now: datetime) -> tuple[list[dict], dict[str, list[dict]]] | None:
+    """Pop the pending events due at now.
+
+    Returns:
+        None if there is nothing to do yet, otherwise (expired, due_by_plug):
+        copies of events whose retry window ended, marked as failed, and
+        copies of events to execute grouped by plug address
+    """
+    _load_scheduled_events()
+
+    # Most ticks have nothing due and nothing to clean up
+    if _next_wakeup is None or now < _next_wakeup:
+        return None
+
+    now_iso = now.isoformat()
+    expired = []
+    due_by_plug: dict[str, list[dict]] = {}
+
+    # Pop pending events whose execution time or retry window end has come.
+    # Saving the results in _apply_processed_events rebuilds the queue.
+    while _pending_queue and _pending_queue[0][0] <= now:
+        _, event_id = heapq.heappop(_pending_queue)
+        event = _events_by_id[event_id]
         if event['status'] != 'pending':
             continue
 
-        target_dt = datetime.fromisoformat(event['target_datetime'])
-        next_retry_at = event.get('next_retry_at')
+        # Work on a copy, the cached event only changes when results are applied
+        event = dict(event)
+        _, retry_window_end = _event_times(event)
 
         # Check if we're past the retry window
-        retry_window_end = target_dt + timedelta(hours=RETRY_WINDOW_HOURS)
-        if now > retry_window_end:
+        if now >= retry_window_end:
             plug_name = event.get('plug_name', 'Unknown')
             event['status'] = 'failed'
             event['error'] = f"Retry window expired ({RETRY_WINDOW_HOURS}h)"
-            event['failed_at'] = now.isoformat()
-            modified = True
+            event['failed_at'] = now_iso
+            expired.append(event)
             logger.error(f"Schedule permanently failed [plug_name={plug_name}, reason=retry_window_expired, retry_count={event.get('retry_count', 0)}]")
             continue
 
-        # Determine when to execute (original target or next retry time)
-        execute_time = datetime.fromisoformat(next_retry_at) if next_retry_at else target_dt
+        # Time to execute, each executed event is completed or rescheduled
+        due_by_plug.setdefault(event['plug_address'], []).append(event)
 
-        if execute_time <= now:
-            # Time to execute
-            plug_address = event['plug_address']
-            plug_name = event.get('plug_name', 'Unknown')
-            desired_state = event.get('desired_state', True)  # Default to ON for backward compatibility
-
-            # Find the plug from shared plug manager
-            plug = plug_manager.get_plug_by_address(plug_address)
-            if plug:
-                try:
-                    # Execute all Tapo operations under lock to prevent concurrent access
-                    with plug.acquire_lock():
-                        # Cancel all countdown timers first to avoid Tapo API errors
-                        plug.cancel_countdown_rules()
-
-                        # Turn plug to desired state
-                        if desired_state:
-                            plug.turn_on()
-                            state_str = "ON"
-                        else:
-                            plug.turn_off()
-                            state_str = "OFF"
-
-                        logger.info(f"Executed scheduled event [plug_name={plug_name}, timestamp={now}, state={state_str}]")
-
-                        # If duration specified, set opposite state timer
-                        duration_seconds = event.get('duration_seconds')
-                        if duration_seconds and duration_seconds > 0:
-                            if desired_state:
-                                plug.turn_off_with_delay(duration_seconds)
-                                logger.info(f"Plug will turn OFF [plug_name={plug_name}, duration={timedelta(seconds=duration_seconds)}]")
-                            else:
-                                plug.turn_on_with_delay(duration_seconds)
-                                logger.info(f"Plug will turn ON [plug_name={plug_name}, duration={timedelta(seconds=duration_seconds)}]")
-
-                    # Send email notification
-                    from_state = not desired_state  # Previous state is opposite of desired
-                    event_type = event.get('type', 'manual')
+    return expired, due_by_plug
+
+
+@_with_events_lock
+def _apply_processed_events(expired: list[dict], results: list[tuple[dict, dict | None]], now: datetime):
+    """Apply processed event copies to the store, clean up old events and save once.
+
+    Args:
+        expired: Event copies marked as failed
+        results: (updated event copy, next occurrence or None) per executed event
+        now: Processing time
+    """
+    events = _load_scheduled_events()
+    modified = False
+
+    for event, next_event in [(e, None) for e in expired] + results:
+        current = _events_by_id.get(event['id'])
+        # Keep events cancelled or removed while the plug operations ran
+        if current is None or current['status'] != 'pending':
+            continue
+        current.update(event)
+        if next_event:
+            events.append(next_event)
+        modified = True
+
+    # Clean up old completed/cancelled events (older than 7 days), only
+    # scanning once the oldest of them has actually aged out
+    active_events = events
+    if _cleanup_due_at is not None and now >= _cleanup_due_at:
+        active_events = _cleanup_old_events(events, now)
+        if len(active_events) != len(events):
+            modified = True
+
+    # Persist processing results and cleanup together in a single write
+    if modified:
+        _save_scheduled_events(active_events)
+    else:
+        # Put back queue entries popped by _take_due_events
+        _index_events(events)
+
+
+def _execute_plug_events(plug_address: str, plug_events: list[dict], now: datetime,
+                         manager_from_email: str | None, manager_to_email: str | None) -> list[dict]:
+    """Execute the due events of one plug in order, updating the event copies in place.
+
+    Runs on a worker thread of process_scheduled_events without the events
+    lock, the results are applied and saved afterwards.
+
+    Returns:
+        (event, next occurrence or None) for each executed event
+    """
+    now_iso = now.isoformat()
+    results = []
 
-                    # Format timestamp
-                    timestamp_local = now.astimezone(TIMEZONE)
-                    timestamp_str = timestamp_local.strftime("%b %d, %H:%M")
+    # Find the plug from shared plug manager
+    plug = plug_manager.get_plug_by_address(plug_address)
+
+    for event in plug_events:
+        next_event = None
+
+        # Read the event fields once
+        plug_name = event.get('plug_name', 'Unknown')
+        desired_state = event.get('desired_state', True)  # Default to ON for backward compatibility
+        duration_seconds = event.get('duration_seconds')
+        event_type = event.get('type', 'manual')
+
+        if plug:
+            try:
+                # All Tapo operations run in one sequence under the plug lock
+                plug.execute_scheduled(desired_state, duration_seconds)
+
+                state_str, opposite_state_str = ("ON", "OFF") if desired_state else ("OFF", "ON")
+                logger.info(f"Executed scheduled event [plug_name={plug_name}, timestamp={now}, state={state_str}]")
+
+                # Opposite state timer, if a duration was specified
+                if duration_seconds and duration_seconds > 0:
+                    logger.info(f"Plug will turn {opposite_state_str} [plug_name={plug_name}, duration={timedelta(seconds=duration_seconds)}]")
+
+                # Send email notification if configured
+                if manager_from_email and manager_to_email:
+                    from_state = not desired_state  # Previous state is opposite of desired
+                    timestamp_str = now.astimezone(TIMEZONE).strftime("%b %d, %H:%M")
 
                     # Build duration info if applicable
                     duration_info = ""
                     if duration_seconds and duration_seconds > 0:
-                        opposite_state = "OFF" if desired_state else "ON"
-                        duration_td = timedelta(seconds=duration_seconds)
-                        # Format duration nicely
-                        hours = duration_td.seconds // 3600
-                        minutes = (duration_td.seconds % 3600) // 60
-                        if hours > 0 and minutes > 0:
-                            duration_str = f"{hours}h {minutes}m"
-                        elif hours > 0:
-                            duration_str = f"{hours}h"
-                        else:
-                            duration_str = f"{minutes}m"
-                        duration_info = f"Will turn {opposite_state} in {duration_str}"
-
-                    # Send email notification if configured
-                    if manager_from_email and manager_to_email:
-                        email_html = render_schedule_execution_email(
-                            plug_name=plug_name,
-                            event_type=event_type,
-                            from_state=from_state,
-                            to_state=desired_state,
-                            timestamp=timestamp_str,
-                            duration_info=duration_info
-                        )
-
-                        send_email(
-                            f"🔌 Plug {plug_name} scheduled {state_str} executed",
-                            email_html,
-                            manager_from_email,
-                            manager_to_email,
-                            attach_chart=False
-                        )
-
-                    event['status'] = 'completed'
-                    event['executed_at'] = now.isoformat()
-                    modified = True
-
-                    # Generate next occurrence for repeating schedules
-                    if event.get('type') == 'repeating':
-                        next_event = _generate_next_occurrence(event)
-                        if next_event:
-                            events.append(next_event)
-
-                except Exception as err:
-                    # Schedule retry with exponential backoff
-                    retry_count = event.get('retry_count', 0) + 1
-                    event['retry_count'] = retry_count
-                    event['last_error'] = str(err)
-                    next_retry = _calculate_next_retry_time(retry_count, now)
-                    event['next_retry_at'] = next_retry.isoformat()
-                    modified = True
-                    logger.warning(f"Schedule execution failed, will retry [plug_name={plug_name}, error={err}, retry_count={retry_count}, next_retry={next_retry}]")
-            else:
-                # Plug not found - schedule retry (config might change)
+                        duration_info = f"Will turn {opposite_state_str} in {_format_duration(duration_seconds)}"
+
+                    email_html = render_schedule_execution_email(
+                        plug_name=plug_name,
+                        event_type=event_type,
+                        from_state=from_state,
+                        to_state=desired_state,
+                        timestamp=timestamp_str,
+                        duration_info=duration_info
+                    )
+
+                    queue_email(
+                        f"🔌 Plug {plug_name} scheduled {state_str} executed",
+                        email_html,
+                        manager_from_email,
+                        manager_to_email,
+                    )
+
+                event['status'] = 'completed'
+                event['executed_at'] = now_iso
+
+                # Generate next occurrence for repeating schedules
+                if event_type == 'repeating':
+                    next_event = _generate_next_occurrence(event)
+
+            except Exception as err:
+                # Schedule retry with exponential backoff
                 retry_count = event.get('retry_count', 0) + 1
                 event['retry_count'] = retry_count
-                event['last_error'] = 'Plug not found'
+                event['last_error'] = str(err)
                 next_retry = _calculate_next_retry_time(retry_count, now)
                 event['next_retry_at'] = next_retry.isoformat()
-                modified = True
-                logger.warning(f"Plug not found, will retry [plug_address={plug_address}, retry_count={retry_count}, next_retry={next_retry}]")
+                logger.warning(f"Schedule execution failed, will retry [plug_name={plug_name}, error={err}, retry_count={retry_count}, next_retry={next_retry}]")
+        else:
+            # Plug not found - schedule retry (config might change)
+            retry_count = event.get('retry_count', 0) + 1
+            event['retry_count'] = retry_count
+            event['last_error'] = 'Plug not found'
+            next_retry = _calculate_next_retry_time(retry_count, now)
+            event['next_retry_at'] = next_retry.isoformat()
+            logger.warning(f"Plug not found, will retry [plug_address={plug_address}, retry_count={retry_count}, next_retry={next_retry}]")
 
-    if modified:
-        _save_scheduled_events(events)
+        results.append((event, next_event))
 
-    # Clean up old completed/cancelled events (older than 7 days)
-    _cleanup_old_events()
+    return results
 
 
-def _cleanup_old_events():
-    """Remove old completed/cancelled events from storage."""
-    events = _load_scheduled_events()
-    now = datetime.now(timezone.utc)
-    cutoff = now - timedelta(days=7)
+def _cleanup_old_events(events: list[dict], now: datetime) -> list[dict]:
+    """Return events without old completed/cancelled ones (older than 7 days)."""
+    cutoff = now - _CLEANUP_AGE
 
     active_events = []
     for e in events:
@@ -452,16 +671,33 @@ def _cleanup_old_events():
             active_events.append(e)
             continue
 
-        event_dt = datetime.fromisoformat(e.get('created_at') or e.get('cancelled_at') or e.get('executed_at') or now.isoformat())
+        stamp = _event_stamp(e)
+        event_dt = _parse_datetime(stamp) if stamp else now
 
         if event_dt > cutoff:
             active_events.append(e)
 
     if len(active_events) != len(events):
-        _save_scheduled_events(active_events)
         logger.info(f"Cleaned up old scheduled events [count={len(events) - len(active_events)}]")
+    return active_events
+
+
+@lru_cache(maxsize=128)
+def _local_hour_to_utc(day: date, hour: int) -> datetime:
+    """Convert an hour of a local calendar day into the matching UTC datetime."""
+    return datetime(day.year, day.month, day.day, hour, tzinfo=TIMEZONE).astimezone(timezone.utc)
+
+
+def _group_contiguous_hours(hours: list[int]) -> list[list[int]]:
+    """Split sorted hours into runs of consecutive hours, e.g. [1, 2, 5] -> [[1, 2], [5]]."""
+    # Within a run, hour - position is constant, so it works as the group key
+    return [
+        [h for _, h in run]
+        for _, run in groupby(enumerate(hours), key=lambda item: item[1] - item[0])
+    ]
 
 
+@_with_events_lock
 def generate_automatic_schedules(plugs: list[Plug], prices: list[tuple[int, float]], target_date: datetime):
     """Generate automatic schedules for all enabled plugs based on electricity prices.
 
@@ -484,19 +720,26 @@ def generate_automatic_schedules(plugs: list[Plug], prices: list[tuple[int, floa
     now = datetime.now(timezone.utc)
     events = [
         e for e in events
-        if not (e.get('type') == 'automatic' and e['status'] == 'pending' and datetime.fromisoformat(e['target_datetime']) >= now)
+        if not _is_future_pending_automatic(e, now)
     ]
 
+    # Resolve dates, timestamps and the price lookup once, not per plug and period
+    target_day = target_date.date()
+    now_iso = now.isoformat()
+    price_map = dict(prices)
+
     # Generate new automatic schedules
     for plug in plugs:
         if not plug.automatic_schedules:
             logger.info(f"Skipping automatic schedule generation [plug_name={plug.name}, reason=manual_mode]")
             continue
 
-        if isinstance(plug.strategy_data, ValleyDetectionStrategyData):
+        # Read the strategy data once, it is replaced whole when targets are recalculated
+        strategy_data = plug.strategy_data
+        if isinstance(strategy_data, ValleyDetectionStrategyData):
             # For valley detection, group contiguous hours into valleys and create one event per valley
-            target_hours = plug.strategy_data.target_hours
-            total_runtime = plug.strategy_data.runtime_seconds
+            target_hours = strategy_data.target_hours
+            total_runtime = strategy_data.runtime_seconds
 
             if not target_hours or total_runtime <= 0:
                 if not target_hours:
@@ -506,41 +749,17 @@ def generate_automatic_schedules(plugs: list[Plug], prices: list[tuple[int, floa
                 continue
 
             # Group contiguous hours into valleys
-            valleys = []
-            current_valley = [target_hours[0]]
-
-            for i in range(1, len(target_hours)):
-                if target_hours[i] == target_hours[i-1] + 1:
-                    # Contiguous hour, add to current valley
-                    current_valley.append(target_hours[i])
-                else:
-                    # Gap found, start new valley
-                    valleys.append(current_valley)
-                    current_valley = [target_hours[i]]
-
-            # Don't forget the last valley
-            valleys.append(current_valley)
+            valleys = _group_contiguous_hours(target_hours)
 
             # Calculate runtime per valley
             runtime_per_valley = total_runtime // len(valleys)
-            price_map = {h: p for h, p in prices}
 
             for valley in valleys:
                 valley_start_hour = valley[0]
                 valley_hours_str = f"[{', '.join(map(str, valley))}]"
                 avg_price = sum(price_map.get(h, 0) for h in valley) / len(valley)
 
-                # Create datetime for the valley start
-                target_dt_local = datetime(
-                    target_date.year,
-                    target_date.month,
-                    target_date.day,
-                    valley_start_hour,
-                    0,  # minute
-                    0,  # second
-                    tzinfo=TIMEZONE
-                )
-                target_dt = target_dt_local.astimezone(timezone.utc)
+                target_dt = _local_hour_to_utc(target_day, valley_start_hour)
 
                 # Skip if target time is in the past
                 if target_dt < now:
@@ -548,24 +767,16 @@ def generate_automatic_schedules(plugs: list[Plug], prices: list[tuple[int, floa
                     continue
 
                 # Create automatic schedule event for this valley
-                event = {
-                    'id': str(uuid.uuid4()),
-                    'plug_address': plug.address,
-                    'plug_name': plug.name,
-                    'target_datetime': target_dt.isoformat(),
-                    'desired_state': True,
-                    'duration_seconds': runtime_per_valley,
-                    'type': 'automatic',
-                    'source_period': 0,
-                    'status': 'pending',
-                    'created_at': now.isoformat()
-                }
+                event = _build_event(
+                    plug.address, plug.name, target_dt, True, runtime_per_valley,
+                    'automatic', now_iso, source_period=0,
+                )
                 events.append(event)
                 logger.info(f"Created automatic schedule [plug_name={plug.name}, strategy=valley_detection, valley={valley_hours_str}, avg_price={avg_price:.4f}, duration={timedelta(seconds=runtime_per_valley)}]")
 
-        elif isinstance(plug.strategy_data, PeriodStrategyData):
+        elif isinstance(strategy_data, PeriodStrategyData):
             # For period strategy (existing behavior)
-            for period_idx, period in enumerate(plug.strategy_data.periods):
+            for period_idx, period in enumerate(strategy_data.periods):
                 if period.target_hour is None:
                     logger.warning(f"Skipping automatic schedule [plug_name={plug.name}, strategy=period, period={period_idx+1}, reason=no_target_hour]")
                     continue
@@ -578,18 +789,7 @@ def generate_automatic_schedules(plugs: list[Plug], prices: list[tuple[int, floa
                     logger.warning(f"Skipping automatic schedule [plug_name={plug.name}, strategy=period, period={period_idx+1}, reason=invalid_runtime, runtime_seconds={runtime_seconds}]")
                     continue
 
-                # Create datetime for the target hour on target_date
-                target_dt_local = datetime(
-                    target_date.year,
-                    target_date.month,
-                    target_date.day,
-                    target_hour,
-                    0,  # minute
-                    0,  # second
-                    tzinfo=TIMEZONE
-                )
-                # Convert to UTC for storage
-                target_dt = target_dt_local.astimezone(timezone.utc)
+                target_dt = _local_hour_to_utc(target_day, target_hour)
 
                 # Skip if target time is in the past
                 if target_dt < now:
@@ -597,20 +797,12 @@ def generate_automatic_schedules(plugs: list[Plug], prices: list[tuple[int, floa
                     continue
 
                 # Create automatic schedule event
-                event = {
-                    'id': str(uuid.uuid4()),
-                    'plug_address': plug.address,
-                    'plug_name': plug.name,
-                    'target_datetime': target_dt.isoformat(),
-                    'desired_state': True,  # Turn ON at cheapest hour
-                    'duration_seconds': runtime_seconds,
-                    'type': 'automatic',
-                    'source_period': period_idx,
-                    'status': 'pending',
-                    'created_at': now.isoformat()
-                }
+                event = _build_event(
+                    plug.address, plug.name, target_dt, True,  # Turn ON at cheapest hour
+                    runtime_seconds, 'automatic', now_iso, source_period=period_idx,
+                )
                 events.append(event)
                 logger.info(f"Created automatic schedule [plug_name={plug.name}, strategy=period, period={period_idx+1}, hour={target_hour}, price={target_price:.4f}, duration={timedelta(seconds=runtime_seconds)}]")
 
     _save_scheduled_events(events)
-    logger.info(f"Generated automatic schedules [date={target_date.date()}]")
+    logger.info(f"Generated automatic schedules [date={target_day}]")
@@ -1,13 +1,22 @@
 from __future__ import annotations
 
+import heapq
 import logging
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import accumulate
+from operator import itemgetter
+from typing import NamedTuple
 
 logger = logging.getLogger("uvicorn.error")
 
+# Price sums closer than this are treated as equal, so rounding drift in
+# prefix sums doesn't change which of two equally cheap blocks is picked
+_SUM_TOLERANCE = 1e-9
 
-@dataclass
+
+@dataclass(slots=True)
 class PeriodConfig:
     """Configuration for a single period in period-based strategy."""
     start_hour: int
@@ -19,7 +28,7 @@ class PeriodConfig:
     target_price: float | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class PeriodStrategyData:
     """Strategy data for period-based scheduling."""
     periods: list[PeriodConfig] = field(default_factory=list)
@@ -35,7 +44,7 @@ class PeriodStrategyData:
         return [p.target_hour for p in self.periods if p.target_hour is not None]
 
 
-@dataclass
+@dataclass(slots=True)
 class ValleyDetectionStrategyData:
     """Strategy data for valley detection scheduling."""
     device_profile: str
@@ -59,6 +68,41 @@ class ValleyDetectionStrategyData:
         return self.target_hours
 
 
+def index_prices_by_hour(prices: list[tuple[int, float]]) -> list[float | None]:
+    """Arrange (hour, price) tuples into a 24-slot list indexed by hour (None if missing)."""
+    price_by_hour = [None] * 24
+    for h, p in prices:
+        price_by_hour[h] = p
+    return price_by_hour
+
+
+def prices_in_window(price_by_hour: list[float | None], start_hour: int, end_hour: int) -> list[tuple[int, float]]:
+    """Get (hour, price) tuples for hours start_hour..end_hour (inclusive), ordered by hour."""
+    return [
+        (h, p)
+        for h, p in enumerate(price_by_hour[start_hour:end_hour + 1], start_hour)
+        if p is not None
+    ]
+
+
+@lru_cache(maxsize=32)
+def _parse_time_range(time_range: str) -> tuple[int, int]:
+    """Parse a "HH:MM-HH:MM" string into (start_hour, end_hour).
+
+    Cached, since the same few config strings are parsed on every calculation.
+    Invalid input raises and is not cached.
+    """
+    start_str, end_str = time_range.split('-')
+    return int(start_str.split(':')[0]), int(end_str.split(':')[0])
+
+
+class Window(NamedTuple):
+    """Hour window (inclusive) in which a device may run."""
+    name: str
+    start: int
+    end: int
+
+
 # Type alias for strategy data union
 StrategyData = PeriodStrategyData | ValleyDetectionStrategyData
 
@@ -110,9 +154,8 @@ class PeriodStrategy(SchedulingStrategy):
             if not period_prices:
                 continue
 
-            # Sort by price and take cheapest N hours
-            sorted_prices = sorted(period_prices, key=lambda x: x[1])
-            cheapest = sorted_prices[:runtime_hours]
+            # Take cheapest N hours without sorting the whole period
+            cheapest = heapq.nsmallest(runtime_hours, period_prices, key=itemgetter(1))
 
             # Add hours to target list (sorted by hour for readability)
             target_hours.extend(sorted([h for h, p in cheapest]))
@@ -129,21 +172,21 @@ class ValleyDetectionStrategy(SchedulingStrategy):
     DEVICE_PROFILES = {
         'water_heater': {
             'windows': [
-                {'name': 'morning', 'start': 2, 'end': 7},
-                {'name': 'evening', 'start': 18, 'end': 22}
+                Window('morning', 2, 7),
+                Window('evening', 18, 22)
             ],
             'cycles': 2  # Split runtime into 2 equal cycles
         },
         'radiator': {
             'windows': [
-                {'name': 'full_day', 'start': 0, 'end': 23}
+                Window('full_day', 0, 23)
             ],
             'cycles': 3,  # Distribute runtime across 3 valleys
             'max_valley_hours': 2  # Max hours per valley
         },
         'generic': {
             'windows': [
-                {'name': 'full_day', 'start': 0, 'end': 23}
+                Window('full_day', 0, 23)
             ],
             'cycles': 1  # Single cheapest valley
         }
@@ -181,44 +224,51 @@ class ValleyDetectionStrategy(SchedulingStrategy):
             if morning_window:
                 parsed = self._parse_time_constraints(morning_window)
                 if parsed:
-                    windows.append({'name': 'morning', 'start': parsed[0]['start'], 'end': parsed[0]['end']})
+                    windows.append(parsed[0]._replace(name='morning'))
             else:
                 # Use default morning window
-                windows.append({'name': 'morning', 'start': 2, 'end': 7})
+                windows.append(Window('morning', 2, 7))
 
             if evening_window:
                 parsed = self._parse_time_constraints(evening_window)
                 if parsed:
-                    windows.append({'name': 'evening', 'start': parsed[0]['start'], 'end': parsed[0]['end']})
+                    windows.append(parsed[0]._replace(name='evening'))
             else:
                 # Use default evening window
-                windows.append({'name': 'evening', 'start': 18, 'end': 22})
+                windows.append(Window('evening', 18, 22))
         else:
             # Use profile defaults
             windows = profile['windows']
 
+        # Hour-indexed prices, so each window is a slice instead of a filter over all prices
+        price_by_hour = index_prices_by_hour(prices)
+
         cycles = profile['cycles']
         hours_per_cycle = runtime_hours / cycles
         max_valley_hours = profile.get('max_valley_hours', hours_per_cycle)
 
+        # Whole-hour block sizes, loop invariant
+        cycle_block_size = int(hours_per_cycle)
+        valley_block_size = min(int(max_valley_hours), cycle_block_size)
+
         target_hours = []
 
         # For water_heater: split runtime equally across windows
         if device_profile == 'water_heater' and len(windows) == 2:
             for window in windows:
-                window_prices = [(h, p) for h, p in prices if window['start'] <= h <= window['end']]
+                window_prices = prices_in_window(price_by_hour, window.start, window.end)
                 if window_prices:
                     valley_hours = self._find_cheapest_contiguous_block(
                         window_prices,
-                        int(hours_per_cycle)
+                        cycle_block_size
                     )
                     target_hours.extend(valley_hours)
-                    logger.info(f"Water heater {window['name']} valley [hours={valley_hours}]")
+                    logger.info(f"Water heater {window.name} valley [hours={valley_hours}]")
 
         # For radiator: find N valleys distributed across day
         elif device_profile == 'radiator':
             window = windows[0]  # Use full day window
-            window_prices = [(h, p) for h, p in prices if window['start'] <= h <= window['end']]
+            window_prices = prices_in_window(price_by_hour, window.start, window.end)
 
             for i in range(cycles):
                 if not window_prices:
@@ -226,21 +276,22 @@ class ValleyDetectionStrategy(SchedulingStrategy):
 
                 valley_hours = self._find_cheapest_contiguous_block(
                     window_prices,
-                    min(int(max_valley_hours), int(hours_per_cycle))
+                    valley_block_size
                 )
                 target_hours.extend(valley_hours)
 
-                # Remove used hours to find next valley
-                window_prices = [(h, p) for h, p in window_prices if h not in valley_hours]
-
-                # Also remove adjacent hours to ensure distribution
-                window_prices = [(h, p) for h, p in window_prices
-                                if not any(abs(h - used_h) <= 1 for used_h in valley_hours)]
+                # Remove used hours and their adjacent hours to find the next,
+                # distributed valley. Bit h of the mask marks hour h, and
+                # (0b111 << used_h) >> 1 sets bits used_h - 1, used_h and used_h + 1
+                forbidden = 0
+                for used_h in valley_hours:
+                    forbidden |= (0b111 << used_h) >> 1
+                window_prices = [(h, p) for h, p in window_prices if not (forbidden >> h) & 1]
 
         # For generic: single cheapest valley
         else:
             window = windows[0]
-            window_prices = [(h, p) for h, p in prices if window['start'] <= h <= window['end']]
+            window_prices = prices_in_window(price_by_hour, window.start, window.end)
             if window_prices:
                 valley_hours = self._find_cheapest_contiguous_block(
                     window_prices,
@@ -263,55 +314,68 @@ class ValleyDetectionStrategy(SchedulingStrategy):
         if not prices or block_size <= 0:
             return []
 
+        # A single hour is always contiguous: the cheapest one (earliest on ties)
+        if block_size == 1:
+            return [min(prices, key=itemgetter(1, 0))[0]]
+
         # Sort prices by hour to ensure contiguity
-        sorted_prices = sorted(prices, key=lambda x: x[0])
+        sorted_prices = sorted(prices, key=itemgetter(0))
+        hours = [h for h, p in sorted_prices]
+
+        # The only candidate block is the whole window
+        if len(hours) == block_size and hours[-1] - hours[0] == block_size - 1:
+            return hours
+
+        # Prefix sums, so any block's price sum is prefix[end] - prefix[start]
+        prefix = list(accumulate((p for h, p in sorted_prices), initial=0))
 
         best_block = []
-        best_avg_price = float('inf')
+        best_sum = float('inf')
 
         # Try all possible contiguous blocks
-        for i in range(len(sorted_prices) - block_size + 1):
-            # Check if hours are contiguous
-            block = sorted_prices[i:i + block_size]
-            hours = [h for h, p in block]
-
-            # Verify contiguity
-            if hours[-1] - hours[0] == block_size - 1:
-                avg_price = sum(p for h, p in block) / block_size
-                if avg_price < best_avg_price:
-                    best_avg_price = avg_price
-                    best_block = hours
+        for i in range(len(hours) - block_size + 1):
+            # Sorted distinct hours are contiguous when the ends are block_size - 1 apart
+            if hours[i + block_size - 1] - hours[i] == block_size - 1:
+                block_sum = prefix[i + block_size] - prefix[i]
+                if block_sum < best_sum - _SUM_TOLERANCE:
+                    best_sum = block_sum
+                    best_block = hours[i:i + block_size]
 
         # If no contiguous block found, fall back to cheapest N hours
         if not best_block:
-            sorted_by_price = sorted(sorted_prices, key=lambda x: x[1])
+            sorted_by_price = sorted(sorted_prices, key=itemgetter(1))
             best_block = sorted([h for h, p in sorted_by_price[:block_size]])
             logger.warning(f"No contiguous block found, using cheapest hours [hours={best_block}]")
 
         return best_block
 
-    def _parse_time_constraints(self, constraints: str) -> list[dict]:
-        """Parse time constraints string into window dictionaries.
+    def _parse_time_constraints(self, constraints: str) -> list[Window]:
+        """Parse time constraints string into windows.
 
         Args:
             constraints: String like "22:00-08:00" or "00:00-23:59"
 
         Returns:
-            List of window dicts with start/end hours
+            List of windows with start/end hours
         """
         try:
-            start_str, end_str = constraints.split('-')
-            start_hour = int(start_str.split(':')[0])
-            end_hour = int(end_str.split(':')[0])
-
-            return [{'name': 'custom', 'start': start_hour, 'end': end_hour}]
+            start_hour, end_hour = _parse_time_range(constraints)
+            return [Window('custom', start_hour, end_hour)]
         except Exception as e:
             logger.error(f"Failed to parse time constraints [constraints={constraints}, error={e}]")
-            return [{'name': 'full_day', 'start': 0, 'end': 23}]
+            return [Window('full_day', 0, 23)]
+
+
+_STRATEGIES: dict[str, SchedulingStrategy] = {
+    'period': PeriodStrategy(),
+    'valley_detection': ValleyDetectionStrategy()
+}
 
 
 def create_strategy(strategy_name: str) -> SchedulingStrategy:
-    """Factory function to create scheduling strategy instances.
+    """Factory function to get scheduling strategy instances.
+
+    Strategies hold no state, so one shared instance per strategy is returned.
 
     Args:
         strategy_name: Name of strategy ('period', 'valley_detection')
@@ -319,14 +383,9 @@ def create_strategy(strategy_name: str) -> SchedulingStrategy:
     Returns:
         Instance of SchedulingStrategy
     """
-    strategies = {
-        'period': PeriodStrategy,
-        'valley_detection': ValleyDetectionStrategy
-    }
-
-    strategy_class = strategies.get(strategy_name)
-    if not strategy_class:
+    strategy = _STRATEGIES.get(strategy_name)
+    if not strategy:
         logger.warning(f"Unknown strategy, defaulting to period [strategy={strategy_name}]")
-        strategy_class = PeriodStrategy
+        strategy = _STRATEGIES['period']
 
-    return strategy_class()
+    return strategy